@@ -13,13 +13,21 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
+import os
 import re
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from html import escape as _esc
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, TextIO, Tuple
 
 CATALOG_PATH = Path("data/master_products.json")
 
+_WS_RE = re.compile(r"\s+")
+_LINE_RE = re.compile(r"(?P<qty>\d+)x?\s+(?P<item>[A-Za-z0-9 \-\.\"']+)")
+
 
 def load_catalog(path: Path) -> List[Dict]:
     with path.open() as f:
@@ -27,10 +35,20 @@ def load_catalog(path: Path) -> List[Dict]:
 
 
 def normalized(text: str) -> str:
-    return re.sub(r"\s+", " ", text.strip().lower())
+    return _WS_RE.sub(" ", text.strip().lower())
+
+
+def normalized_many(texts: Iterable[str]) -> List[str]:
+    texts = list(texts)
+    # One lower() and regex pass over the whole batch. NUL is not matched by
+    # \s, so it survives as the separator between texts.
+    if any("\0" in t for t in texts):
+        return [normalized(t) for t in texts]
+    joined = "\0".join(t.strip() for t in texts).lower()
+    return _WS_RE.sub(" ", joined).split("\0") if texts else []
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderLine:
     source_description: str
     quantity: int
@@ -39,7 +57,7 @@ class OrderLine:
     confidence: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class GoldenRecord:
     request_id: str
     customer: str
@@ -68,42 +86,164 @@ class GoldenRecord:
 
 
 class SKUMatcher:
-    def __init__(self, catalog: Iterable[Dict]):
+    def __init__(self, catalog: Iterable[Dict], cache_size: Optional[int] = 4096):
+        if cache_size is not None and cache_size < 0:
+            raise ValueError(f"cache_size must be None or at least 0, got {cache_size}")
         self.catalog = list(catalog)
+        # LRU cache of match results keyed by normalized text; None means
+        # unbounded and 0 disables caching.
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, Tuple[Optional[str], float]] = OrderedDict()
+        # Aliases are static, so normalize and tokenize them once up front.
+        # They are stored as parallel arrays indexed by alias position (in
+        # catalog order), with an inverted token index on top. Each alias's
+        # token set is encoded as a bitmask over the catalog vocabulary, and
+        # maps back to its SKU through a position into _sku_ids.
+        self._sku_ids: List[str] = [item["sku_id"] for item in self.catalog]
+        self._alias_sku_index = array("I")
+        self._alias_norms: List[str] = []
+        self._alias_masks: List[int] = []
+        self._alias_popcounts = array("I")
+        # Maps each vocabulary token to its single-bit mask.
+        self._token_bits: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        # Exact lookups for the common case where a message names an alias.
+        self._alias_to_sku: Dict[str, str] = {}
+        self._alias_tokens_to_sku: Dict[FrozenSet[str], str] = {}
+        aliases = [
+            (sku_index, alias)
+            for sku_index, item in enumerate(self.catalog)
+            for alias in [item["name"], *item.get("synonyms", [])]
+        ]
+        alias_norms = normalized_many(alias for _, alias in aliases)
+        for (sku_index, _), alias_norm in zip(aliases, alias_norms):
+            sku_id = self._sku_ids[sku_index]
+            alias_tokens = frozenset(alias_norm.split())
+            idx = len(self._alias_norms)
+            mask = 0
+            for token in alias_tokens:
+                bit = self._token_bits.get(token)
+                if bit is None:
+                    bit = self._token_bits[token] = 1 << len(self._token_bits)
+                mask |= bit
+                self._postings.setdefault(token, []).append(idx)
+            self._alias_sku_index.append(sku_index)
+            self._alias_norms.append(alias_norm)
+            self._alias_masks.append(mask)
+            self._alias_popcounts.append(len(alias_tokens))
+            self._alias_to_sku.setdefault(alias_norm, sku_id)
+            self._alias_tokens_to_sku.setdefault(alias_tokens, sku_id)
 
     def match(self, description: str) -> Tuple[Optional[str], float]:
-        text = normalized(description)
-        best_score = 0.0
-        best_sku = None
-        for item in self.catalog:
-            candidates = [item["name"], *item.get("synonyms", [])]
-            for alias in candidates:
-                alias_norm = normalized(alias)
-                if alias_norm in text or text in alias_norm:
-                    score = 0.9
-                else:
-                    score = self._token_overlap(alias_norm, text)
-                if score > best_score:
-                    best_score = score
-                    best_sku = item["sku_id"]
-        return best_sku, best_score
-
-    @staticmethod
-    def _token_overlap(a: str, b: str) -> float:
-        a_tokens, b_tokens = set(a.split()), set(b.split())
-        if not a_tokens or not b_tokens:
-            return 0.0
-        overlap = len(a_tokens & b_tokens) / len(a_tokens | b_tokens)
-        return overlap
+        return self.match_normalized(normalized(description))
+
+    def match_normalized(self, text: str) -> Tuple[Optional[str], float]:
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+        result = self._score(text)
+        if self.cache_size != 0:
+            self._cache[text] = result
+            if self.cache_size is not None and len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _score(self, text: str) -> Tuple[Optional[str], float]:
+        hit = self._alias_to_sku.get(text)
+        if hit:
+            return hit, 1.0
+        text_tokens = frozenset(text.split())
+        hit = self._alias_tokens_to_sku.get(text_tokens)
+        if hit:
+            return hit, 1.0
+        # Only aliases sharing a token with the query can have a non-zero overlap.
+        candidate_ids = set().union(*(self._postings.get(t, ()) for t in text_tokens))
+        token_bits = self._token_bits
+        q_mask = 0
+        for token in text_tokens:
+            q_mask |= token_bits.get(token, 0)
+        # Jaccard overlap via popcount, inlined over local bindings to keep the
+        # per-alias cost to a few int ops. q_pop also counts query tokens outside
+        # the vocabulary (no bit in q_mask); candidates always share a token.
+        masks, popcounts, q_pop = self._alias_masks, self._alias_popcounts, len(text_tokens)
+        # A substring hit scores 0.9, which token overlap can only beat by
+        # exceeding it, so the substring scan stops at the first hit in catalog
+        # order. Ties go to the earlier alias.
+        alias_norms = self._alias_norms
+        hit_idx = next(
+            (idx for idx, alias_norm in enumerate(alias_norms)
+             if alias_norm in text or text in alias_norm),
+            -1,
+        )
+        best_idx = hit_idx
+        best_score = 0.9 if hit_idx >= 0 else 0.0
+        for idx in candidate_ids:
+            inter = (masks[idx] & q_mask).bit_count()
+            score = inter / (popcounts[idx] + q_pop - inter)
+            if score > best_score or (score == best_score and idx < best_idx):
+                # Later substring hits are pinned to 0.9 and cannot win.
+                if hit_idx >= 0 and idx >= hit_idx:
+                    alias_norm = alias_norms[idx]
+                    if alias_norm in text or text in alias_norm:
+                        continue
+                best_idx, best_score = idx, score
+        if best_idx < 0:
+            return None, 0.0
+        return self._sku_ids[self._alias_sku_index[best_idx]], best_score
 
 
 class QuickWinPipeline:
-    def __init__(self, catalog_path: Path = CATALOG_PATH):
-        self.catalog = load_catalog(catalog_path)
+    def __init__(
+        self,
+        catalog_path: Path = CATALOG_PATH,
+        catalog: Optional[List[Dict]] = None,
+        pool_min_batch: int = 5000,
+    ):
+        self.catalog = catalog if catalog is not None else load_catalog(catalog_path)
+        # ingest_many only starts a process pool for batches at least this big;
+        # below it, pool startup and pickling cost more than parallel matching
+        # saves. Tune per deployment.
+        self.pool_min_batch = pool_min_batch
         self.matcher = SKUMatcher(self.catalog)
         self.register: Dict[str, GoldenRecord] = {}
 
     def ingest(self, message: str, customer: str, channel: str = "LINE OA") -> GoldenRecord:
+        """Register a message as a validated record."""
+        record = self._build_record(message, customer, channel)
+        self.register[record.request_id] = record
+        return record
+
+    def ingest_many(
+        self, payloads: Iterable[Dict[str, str]], workers: Optional[int] = None
+    ) -> List[GoldenRecord]:
+        """Register a batch of ``{"message", "customer", "channel"}`` payloads.
+
+        Batches of at least ``pool_min_batch`` payloads are matched in a process
+        pool of ``workers`` processes (default: one per CPU); smaller batches,
+        or ``workers=1``, run serially. Records are returned and registered in
+        payload order either way.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        elif workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        payloads = list(payloads)
+        if workers == 1 or len(payloads) < self.pool_min_batch:
+            records = [self._build_record(*_payload_args(p)) for p in payloads]
+        else:
+            # Matching is pure-Python CPU work, so use processes rather than
+            # threads. Each worker builds its own matcher once from the catalog.
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(self.catalog,)
+            ) as pool:
+                chunksize = max(1, len(payloads) // (workers * 4))
+                records = list(pool.map(_build_record_in_worker, payloads, chunksize=chunksize))
+        for record in records:
+            self.register[record.request_id] = record
+        return records
+
+    def _build_record(self, message: str, customer: str, channel: str) -> GoldenRecord:
         request_id = self._generate_id(message, customer)
         record = GoldenRecord(
             request_id=request_id,
@@ -114,17 +254,16 @@ class QuickWinPipeline:
         record.lines = self._extract_lines(message)
         record.status = "extracted"
         self._match_and_validate(record)
-        self.register[request_id] = record
         return record
 
     def _generate_id(self, message: str, customer: str) -> str:
-        digest = hashlib.sha1(f"{customer}-{message}".encode()).hexdigest()[:8]
+        # Not a security boundary: a short, fast digest is all the id needs.
+        digest = hashlib.blake2b(f"{customer}-{message}".encode(), digest_size=4).hexdigest()
         return f"REQ-{digest}"
 
     def _extract_lines(self, message: str) -> List[OrderLine]:
         lines = []
-        pattern = re.compile(r"(?P<qty>\d+)x?\s+(?P<item>[A-Za-z0-9 \-\.\"']+)")
-        for match in pattern.finditer(message):
+        for match in _LINE_RE.finditer(message):
             qty = int(match.group("qty"))
             item = match.group("item").strip()
             lines.append(OrderLine(source_description=item, quantity=qty))
@@ -135,10 +274,10 @@ class QuickWinPipeline:
 
     def _match_and_validate(self, record: GoldenRecord) -> None:
         for line in record.lines:
-            sku, score = self.matcher.match(line.source_description)
+            line.normalized_description = normalized(line.source_description)
+            sku, score = self.matcher.match_normalized(line.normalized_description)
             line.matched_sku = sku
             line.confidence = score
-            line.normalized_description = normalized(line.source_description)
             if not sku:
                 record.validation_notes.append(
                     f"No SKU match for '{line.source_description}' (qty {line.quantity})"
@@ -153,6 +292,22 @@ class QuickWinPipeline:
         return [rec.summary() for rec in self.register.values()]
 
 
+_worker_pipeline: Optional[QuickWinPipeline] = None
+
+
+def _init_worker(catalog: List[Dict]) -> None:
+    global _worker_pipeline
+    _worker_pipeline = QuickWinPipeline(catalog=catalog)
+
+
+def _build_record_in_worker(payload: Dict[str, str]) -> GoldenRecord:
+    return _worker_pipeline._build_record(*_payload_args(payload))
+
+
+def _payload_args(payload: Dict[str, str]) -> Tuple[str, str, str]:
+    return payload["message"], payload["customer"], payload.get("channel", "LINE OA")
+
+
 def demo_messages() -> List[Dict[str, str]]:
     return [
         {
@@ -173,62 +328,17 @@ def demo_messages() -> List[Dict[str, str]]:
     ]
 
 
-def render_html_dashboard(records: List[Dict]) -> str:
-    rows = []
-    for rec in records:
-        lines_html = "".join(
-            f"<li><strong>{line['quantity']}×</strong> {line['source_description']}"
-            f" → <code>{line['matched_sku'] or '—'}</code>"
-            f" <span class='chip'>{line['confidence']:.2f}</span></li>"
-            for line in rec["lines"]
-        )
-        notes_html = (
-            "".join(f"<li>{note}</li>" for note in rec["validation_notes"])
-            or "<li>None</li>"
-        )
-        rows.append(
-            f"""
-<article class='card'>
-  <header>
-    <div>
-      <div class='label'>Request ID</div>
-      <div class='value'>{rec['request_id']}</div>
-    </div>
-    <div>
-      <div class='label'>Customer</div>
-      <div class='value'>{rec['customer']}</div>
-    </div>
-    <div>
-      <div class='label'>Channel</div>
-      <div class='value'>{rec['channel']}</div>
-    </div>
-    <div class='status {rec['status']}'>{rec['status']}</div>
-  </header>
-  <div class='section'>
-    <div class='section-title'>Line items</div>
-    <ul class='list'>
-      {lines_html}
-    </ul>
-  </div>
-  <div class='section'>
-    <div class='section-title'>Validation notes</div>
-    <ul class='list notes'>
-      {notes_html}
-    </ul>
-  </div>
-</article>
-"""
-        )
-
-    return f"""
+_HTML_HEAD = """
 <!doctype html>
 <html lang='en'>
 <head>
   <meta charset='UTF-8'/>
   <meta name='viewport' content='width=device-width, initial-scale=1.0'/>
   <title>Quick Win Demo Dashboard</title>
-  <style>
-    :root {{
+"""
+
+_HTML_CSS = """  <style>
+    :root {
       --bg: #0f172a;
       --card: #111827;
       --text: #e5e7eb;
@@ -236,48 +346,48 @@ def render_html_dashboard(records: List[Dict]) -> str:
       --accent: #3b82f6;
       --warning: #f97316;
       --border: #1f2937;
-    }}
-    body {{
+    }
+    body {
       margin: 0;
       font-family: 'Inter', system-ui, -apple-system, sans-serif;
       background: radial-gradient(circle at 10% 20%, #1e293b 0, #0f172a 25%),
                   radial-gradient(circle at 80% 0, #0b2345 0, #0f172a 35%),
                   #0f172a;
       color: var(--text);
-    }}
-    .page {{
+    }
+    .page {
       max-width: 1200px;
       margin: 0 auto;
       padding: 40px 24px 64px;
-    }}
-    h1 {{
+    }
+    h1 {
       margin: 0 0 8px;
       font-size: 32px;
       letter-spacing: -0.02em;
-    }}
-    .subtitle {{ color: var(--muted); margin-bottom: 24px; }}
-    .grid {{
+    }
+    .subtitle { color: var(--muted); margin-bottom: 24px; }
+    .grid {
       display: grid;
       gap: 16px;
       grid-template-columns: repeat(auto-fit, minmax(320px, 1fr));
-    }}
-    .card {{
+    }
+    .card {
       background: var(--card);
       border: 1px solid var(--border);
       border-radius: 16px;
       padding: 16px;
       box-shadow: 0 10px 30px rgba(0, 0, 0, 0.35);
-    }}
-    header {{
+    }
+    header {
       display: grid;
       grid-template-columns: repeat(4, minmax(0, 1fr));
       gap: 12px;
       align-items: center;
       margin-bottom: 12px;
-    }}
-    .label {{ color: var(--muted); font-size: 12px; text-transform: uppercase; letter-spacing: 0.05em; }}
-    .value {{ font-weight: 600; }}
-    .status {{
+    }
+    .label { color: var(--muted); font-size: 12px; text-transform: uppercase; letter-spacing: 0.05em; }
+    .value { font-weight: 600; }
+    .status {
       justify-self: end;
       padding: 6px 10px;
       border-radius: 999px;
@@ -288,12 +398,12 @@ def render_html_dashboard(records: List[Dict]) -> str:
       border: 1px solid var(--border);
       background: rgba(59, 130, 246, 0.12);
       color: var(--text);
-    }}
-    .status.needs_review {{ background: rgba(249, 115, 22, 0.18); color: #fb923c; }}
-    .section {{ margin-top: 10px; }}
-    .section-title {{ color: var(--muted); font-size: 13px; margin-bottom: 6px; }}
-    .list {{ list-style: none; padding: 0; margin: 0; display: grid; gap: 6px; }}
-    .list li {{
+    }
+    .status.warn { background: rgba(249, 115, 22, 0.18); color: #fb923c; }
+    .section { margin-top: 10px; }
+    .section-title { color: var(--muted); font-size: 13px; margin-bottom: 6px; }
+    .list { list-style: none; padding: 0; margin: 0; display: grid; gap: 6px; }
+    .list li {
       background: rgba(255, 255, 255, 0.03);
       border: 1px solid var(--border);
       border-radius: 12px;
@@ -302,9 +412,9 @@ def render_html_dashboard(records: List[Dict]) -> str:
       align-items: center;
       gap: 8px;
       font-size: 14px;
-    }}
-    .list.notes li {{ color: var(--muted); font-size: 13px; }}
-    .chip {{
+    }
+    .list.notes li { color: var(--muted); font-size: 13px; }
+    .chip {
       margin-left: auto;
       padding: 4px 8px;
       border-radius: 999px;
@@ -312,28 +422,118 @@ def render_html_dashboard(records: List[Dict]) -> str:
       font-size: 12px;
       color: #bfdbfe;
       border: 1px solid rgba(59, 130, 246, 0.35);
-    }}
-    code {{ background: rgba(255, 255, 255, 0.05); padding: 2px 6px; border-radius: 6px; }}
+    }
+    code { background: rgba(255, 255, 255, 0.05); padding: 2px 6px; border-radius: 6px; }
   </style>
-</head>
+"""
+
+_HTML_BODY_OPEN = """</head>
 <body>
   <div class='page'>
     <h1>Quick Win Demo Dashboard</h1>
     <div class='subtitle'>Golden Records created from the sample Order Register.</div>
     <div class='grid'>
-      {''.join(rows)}
+      """
+
+_HTML_CLOSE = """
     </div>
   </div>
 </body>
 </html>
 """
 
+_CARD_OPEN = """
+<article class='card'>
+  <header>
+    <div>
+      <div class='label'>Request ID</div>
+      <div class='value'>%s</div>
+    </div>
+    <div>
+      <div class='label'>Customer</div>
+      <div class='value'>%s</div>
+    </div>
+    <div>
+      <div class='label'>Channel</div>
+      <div class='value'>%s</div>
+    </div>
+    <div class='status %s'>%s</div>
+  </header>
+  <div class='section'>
+    <div class='section-title'>Line items</div>
+    <ul class='list'>
+      """
+
+_CARD_MIDDLE = """
+    </ul>
+  </div>
+  <div class='section'>
+    <div class='section-title'>Validation notes</div>
+    <ul class='list notes'>
+      """
+
+_CARD_CLOSE = """
+    </ul>
+  </div>
+</article>
+"""
+
+_STATUS_CLASSES = {
+    "received": "info",
+    "extracted": "info",
+    "validated": "ok",
+    "needs_review": "warn",
+}
+
+_LINE_ITEM = (
+    "<li><strong>%s×</strong> %s"
+    " → <code>%s</code>"
+    " <span class='chip'>%.2f</span></li>"
+)
+
+
+def _render_chunks(records: List[Dict]) -> Iterator[str]:
+    yield _HTML_HEAD
+    yield _HTML_CSS
+    yield _HTML_BODY_OPEN
+    for rec in records:
+        status = rec["status"]
+        yield _CARD_OPEN % (
+            _esc(rec["request_id"], quote=False),
+            _esc(rec["customer"], quote=False),
+            _esc(rec["channel"], quote=False),
+            _STATUS_CLASSES.get(status, "info"),
+            _esc(status, quote=False),
+        )
+        for line in rec["lines"]:
+            yield _LINE_ITEM % (
+                line["quantity"],
+                _esc(line["source_description"], quote=False),
+                _esc(line["matched_sku"], quote=False) if line["matched_sku"] else "—",
+                line["confidence"],
+            )
+        yield _CARD_MIDDLE
+        if rec["validation_notes"]:
+            for note in rec["validation_notes"]:
+                yield "<li>%s</li>" % _esc(note, quote=False)
+        else:
+            yield "<li>None</li>"
+        yield _CARD_CLOSE
+    yield _HTML_CLOSE
+
+
+def write_html_dashboard(records: List[Dict], out: TextIO) -> None:
+    out.writelines(_render_chunks(records))
+
+
+def render_html_dashboard(records: List[Dict]) -> str:
+    return "".join(_render_chunks(records))
+
 
 def run_demo(html_path: Optional[Path] = None):
     pipeline = QuickWinPipeline()
     print("=== Quick Win Demo ===")
-    for payload in demo_messages():
-        record = pipeline.ingest(payload["message"], payload["customer"], payload["channel"])
+    for record in pipeline.ingest_many(demo_messages()):
         print(f"\nRequest {record.request_id} from {record.customer} via {record.channel}")
         print(f"Status: {record.status}")
         for line in record.lines:
@@ -347,12 +547,13 @@ def run_demo(html_path: Optional[Path] = None):
             for note in record.validation_notes:
                 print(f"    * {note}")
     print("\nDashboard snapshot:")
-    for rec in pipeline.dashboard():
+    records = pipeline.dashboard()
+    for rec in records:
         print(json.dumps(rec, indent=2))
 
     if html_path:
-        records = pipeline.dashboard()
-        html_path.write_text(render_html_dashboard(records))
+        with html_path.open("w", encoding="utf-8") as f:
+            write_html_dashboard(records, f)
         print(f"\nSaved HTML dashboard to {html_path.resolve()}")
 
 
@@ -0,0 +1,32 @@
+import unittest
+from pathlib import Path
+
+import quick_win_demo as demo
+
+CATALOG_PATH = Path(__file__).resolve().parents[1] / "data" / "master_products.json"
+
+
+class IngestManyTest(unittest.TestCase):
+    def setUp(self):
+        self.payloads = demo.demo_messages() + [
+            {"customer": f"Customer {i}", "channel": "Email", "message": f"Need {i} pvc pipe 2in and {i + 1}x 8p switch"}
+            for i in range(20)
+        ]
+
+    def test_process_pool_matches_serial_path(self):
+        serial = demo.QuickWinPipeline(CATALOG_PATH)
+        pooled = demo.QuickWinPipeline(CATALOG_PATH, pool_min_batch=0)
+        serial_records = serial.ingest_many(self.payloads, workers=1)
+        pooled_records = pooled.ingest_many(self.payloads, workers=4)
+        self.assertEqual(pooled_records, serial_records)
+        self.assertEqual(list(pooled.register), list(serial.register))
+        self.assertEqual(pooled.dashboard(), serial.dashboard())
+
+    def test_rejects_workers_below_one(self):
+        pipeline = demo.QuickWinPipeline(CATALOG_PATH)
+        with self.assertRaises(ValueError):
+            pipeline.ingest_many(self.payloads, workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+
+import quick_win_demo as demo
+
+
+class LineExtractionTest(unittest.TestCase):
+    def test_non_breaking_space_separates_quantity(self):
+        lines = demo.QuickWinPipeline(catalog=[])._extract_lines("5\xa0PVC pipe")
+        self.assertEqual([(line.quantity, line.source_description) for line in lines], [(5, "PVC pipe")])
+
+    def test_non_ascii_digits_parse_as_quantity(self):
+        pipeline = demo.QuickWinPipeline(catalog=[])
+        for message in ("٣ pvc pipe", "३ pvc pipe", "๓ pvc pipe"):
+            with self.subTest(message=message):
+                lines = pipeline._extract_lines(message)
+                self.assertEqual([(line.quantity, line.source_description) for line in lines], [(3, "pvc pipe")])
+
+
+if __name__ == "__main__":
+    unittest.main()